@@ -1,109 +1,464 @@
 import streamlit as st
-from bs4 import BeautifulSoup
 import re
-import time
 from urllib.parse import urljoin, urlparse
 import json
 import asyncio
+import io
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+import atexit
+import copy
+import os
+import queue
+import shutil
+import tempfile
+
+# Compact visited-URL set for deep crawls
+from pybloom_live import ScalableBloomFilter
+
+# Streaming HTML parsing for the page-source fallback
+from lxml import etree
 
 # LLM API integration using groq
-from groq import Groq
+from groq import AsyncGroq, DefaultAioHttpClient
 
 # Selenium imports
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import JavascriptException, TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.core.os_manager import ChromeType
 
-# Create a global groq client instance
-groq_client = Groq()
+# Maximum number of concurrent LLM validation requests across all crawls of one run,
+# shared through a single semaphore so the API key's per-model TPM limits hold.
+LLM_CONCURRENCY = 8
+
+# Characters of parent text kept per anchor, by both the in-page and the HTML extractor.
+ANCHOR_TEXT_LIMIT = 200
+# Elements whose content innerText leaves out, so the HTML extractor skips it too.
+_SKIPPED_TAGS = frozenset({"script", "style", "noscript", "template"})
+
+# Link heuristics, compiled once and run over whole columns of anchors (see
+# matching_rows); $ needs re.M there so it matches at the end of each row.
+_KW_RE = re.compile(r"product|item", re.I)
+# Product-style URL paths (/p/, /dp/, /products/, -p-<digits>, long numeric ids) that
+# are trusted without an LLM call, and non-product paths that are never queued for it.
+_STRONG_PATH_RE = re.compile(r"/(?:p|dp|products?|item|sku)/|[-_/]p[-_/]?\d{3,}|/\d{6,}(?:[/?]|$)", re.I | re.M)
+_NEGATIVE_RE = re.compile(r"/(?:category|categories|collection|tag|blog|about|contact|help|login|cart|account)/", re.I)
+# Any of: a /product/ or /item/ path segment, a price, or "Add to Cart".
+_HEURISTIC_RE = re.compile(r"/(?:product|item)/|\$\d+|add to cart", re.I)
+
+# Maximum number of category pages crawled concurrently; one pooled driver each.
+CRAWL_CONCURRENCY = 4
+DRIVER_POOL_SIZE = CRAWL_CONCURRENCY
+
+# Query parameters that only track the visit and never change the page.
+_TRACKING_PARAM_PREFIXES = ("utm_", "gclid", "fbclid")
+
+# The verdict list inside the LLM's JSON reply, and the only answers accepted from it.
+_VERDICTS = frozenset({"YES", "NO"})
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.S)
+
+# hrefs that can never be product pages: non-HTTP schemes, in-page anchors and static assets.
+_BAD_PREFIXES = ("mailto:", "tel:", "javascript:", "#", "data:")
+_ASSET_EXTS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".css", ".js",
+    ".ico", ".woff", ".woff2", ".mp4", ".pdf",
+)
+
+# Restart a pooled Chromium after this many page loads to bound its memory.
+MAX_PAGES_PER_DRIVER = 50
+# Free /dev/shm space required per driver profile (the disk cache is kept elsewhere)
+# before profiles are placed there instead of on disk.
+SHM_BYTES_PER_PROFILE = 64 * 1024 * 1024
+
+
+@st.cache_resource(ttl=3600)
+def get_verdict_cache():
+    """
+    Process-wide cache of LLM verdicts keyed by (url without query/fragment, context hash).
+    Cached as a resource so the same dict survives Streamlit reruns and sessions.
+    """
+    return {}
+
+
+def normalize_url(url):
+    """
+    Strips the fragment and tracking query parameters (utm_*, gclid, fbclid) so
+    near-duplicate links collapse to one URL. The remaining query is kept verbatim.
+    """
+    base, _, query = url.partition("#")[0].partition("?")
+    kept = [
+        pair
+        for pair in query.split("&")
+        if pair and not pair.partition("=")[0].lower().startswith(_TRACKING_PARAM_PREFIXES)
+    ]
+    return f"{base}?{'&'.join(kept)}" if kept else base
+
+
+def verdict_cache_key(url, context):
+    return (urlparse(url)._replace(query="", fragment="").geturl(), hash(context[:80]))
+
+
+# Headless and extra options for a containerized/cloud environment, built once.
+# /dev/shm is often small (64 MB in Docker), so Chromium's shared memory stays in /tmp.
+_CHROME_OPTIONS = Options()
+_CHROME_OPTIONS.add_argument("--headless")
+_CHROME_OPTIONS.add_argument("--disable-gpu")
+_CHROME_OPTIONS.add_argument("--no-sandbox")
+_CHROME_OPTIONS.add_argument("--disable-dev-shm-usage")
+
+
+@st.cache_resource
+def get_chromedriver_path():
+    """
+    Uses ChromeDriverManager to auto-install the correct driver for Chromium, once per process.
+    """
+    return ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+
+
+def launch_driver(profile_dir, cache_dir):
+    """
+    Starts a headless Chromium configured for a containerized/cloud environment,
+    keeping its profile in profile_dir and its disk cache in cache_dir.
+    """
+    options = copy.deepcopy(_CHROME_OPTIONS)
+    options.add_argument(f"--user-data-dir={profile_dir}")
+    options.add_argument(f"--disk-cache-dir={cache_dir}")
+    service = Service(get_chromedriver_path())
+    return webdriver.Chrome(service=service, options=options)
+
+
+@st.cache_resource
+def get_driver_pool():
+    """
+    Pool of DRIVER_POOL_SIZE reusable Chromium slots, one per concurrent crawl.
+    Cached as a resource so the browsers survive Streamlit reruns; a fetch takes a
+    slot for its exclusive use and returns it when done. Each slot has its own
+    Chromium profile directory, on tmpfs (/dev/shm) when it has room for all of
+    them, and its own disk cache directory, which always stays on disk.
+    """
+    profile_root = None
+    if os.path.isdir("/dev/shm"):
+        if shutil.disk_usage("/dev/shm").free >= DRIVER_POOL_SIZE * SHM_BYTES_PER_PROFILE:
+            profile_root = "/dev/shm"
+    pool = queue.Queue()
+    for _ in range(DRIVER_POOL_SIZE):
+        slot = {
+            "driver": None,
+            "pages": 0,
+            "profile_dir": tempfile.mkdtemp(prefix="chrome-profile-", dir=profile_root),
+            "cache_dir": tempfile.mkdtemp(prefix="chrome-cache-"),
+        }
+        atexit.register(shutdown_slot, slot)
+        pool.put(slot)
+    return pool
+
+
+def get_driver(slot):
+    """
+    Returns the slot's live driver, launching Chromium lazily and recycling it
+    every MAX_PAGES_PER_DRIVER pages to bound browser memory.
+    """
+    if slot["driver"] is not None and slot["pages"] >= MAX_PAGES_PER_DRIVER:
+        release_driver(slot)
+    if slot["driver"] is None:
+        slot["driver"] = launch_driver(slot["profile_dir"], slot["cache_dir"])
+    slot["pages"] += 1
+    return slot["driver"]
+
+
+def release_driver(slot):
+    """
+    Quits the slot's driver (if any) so the next get_driver call starts a fresh one.
+    """
+    driver, slot["driver"], slot["pages"] = slot["driver"], None, 0
+    if driver is not None:
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Failed to quit driver: {e}")
+
+
+def shutdown_slot(slot):
+    """
+    Quits the slot's driver and deletes its profile and cache directories; registered with atexit.
+    """
+    release_driver(slot)
+    shutil.rmtree(slot["profile_dir"], ignore_errors=True)
+    shutil.rmtree(slot["cache_dir"], ignore_errors=True)
 
 
 def fetch_category_page_content(url):
     """
     Uses headless Selenium to fetch a category page with dynamic JS-rendered
     content, handling infinite scrolling until no new content is loaded.
+    Reuses a pooled driver and retries once on a fresh one if the browser fails.
+    
+    Returns the page's links as anchor records:
+        (href, anchor_text, parent_text, parent_classes)
     """
+    pool = get_driver_pool()
+    slot = pool.get()
     try:
-        options = Options()
-        # Headless and extra options for a containerized/cloud environment.
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        
-        # Use ChromeDriverManager to auto-install the correct driver for Chromium.
-        service = Service(
-            ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
-        )
-        driver = webdriver.Chrome(service=service, options=options)
-        
-        driver.get(url)
-        # Initial wait for content to load.
-        time.sleep(3)
-        scroll_pause_time = 3
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        scroll_count = 0
-        while scroll_count < 10:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(scroll_pause_time)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
+        for attempt in range(2):
+            try:
+                return scroll_and_capture(get_driver(slot), url)
+            except (JavascriptException, TimeoutException) as e:
+                # Page-side script errors and timeouts leave the browser usable.
+                print(f"Infinite scrolling fetch failed for {url}: {e}")
                 break
-            last_height = new_height
-            scroll_count += 1
-        content = driver.page_source
-        driver.quit()
-        return content
-    except Exception as e:
-        print(f"Infinite scrolling fetch failed for {url}: {e}")
-    return ""
+            except WebDriverException as e:
+                print(f"Driver failed for {url} (attempt {attempt + 1}): {e}")
+                release_driver(slot)
+            except Exception as e:
+                print(f"Infinite scrolling fetch failed for {url}: {e}")
+                break
+    finally:
+        pool.put(slot)
+    return []
+
+
+# Scrolls to the bottom, then polls document height in-page every 100 ms until it
+# grows or the timeout (ms, first argument) elapses. Resolves to whether it grew.
+SCROLL_AND_WAIT_JS = """
+const done = arguments[arguments.length - 1];
+const timeout = arguments[0];
+const start = document.body.scrollHeight;
+const deadline = Date.now() + timeout;
+window.scrollTo(0, start);
+(function poll() {
+    if (document.body.scrollHeight !== start) { done(true); return; }
+    if (Date.now() >= deadline) { done(false); return; }
+    setTimeout(poll, 100);
+})();
+"""
+
+
+# Collects every link as [href, anchor text, parent text, parent classes] in one call,
+# so the page never has to be serialized and re-parsed in Python.
+EXTRACT_ANCHORS_JS = """
+const squash = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+return JSON.stringify([...document.querySelectorAll('a[href]')].map(a => [
+    a.getAttribute('href'),
+    squash(a.innerText).slice(0, 120),
+    squash(a.parentElement ? a.parentElement.innerText : a.innerText).slice(0, arguments[0]),
+    a.parentElement ? a.parentElement.getAttribute('class') || '' : '',
+]));
+"""
+
+
+class _Element:
+    """
+    An open element in AnchorCollector: its href and document position (anchors
+    only), class attribute, text so far (capped at ANCHOR_TEXT_LIMIT) and the
+    anchors it is the parent of.
+    """
+    __slots__ = ("href", "position", "classes", "parts", "size", "anchors")
+
+    def __init__(self, href, position, classes):
+        self.href = href
+        self.position = position
+        self.classes = classes
+        self.parts = []
+        self.size = 0
+        self.anchors = []
+
+    def add_text(self, text):
+        if self.size >= ANCHOR_TEXT_LIMIT:
+            return
+        if text.isspace():
+            if self.parts and self.parts[-1] != " ":
+                self.parts.append(" ")
+            return
+        self.parts.append(text[:ANCHOR_TEXT_LIMIT])
+        self.size += len(text.strip())
+
+    def text(self):
+        return " ".join("".join(self.parts).split())[:ANCHOR_TEXT_LIMIT]
 
 
-def determine_link_type(a_tag):
+class AnchorCollector:
     """
-    Analyzes an <a> element to decide if it likely points to a product page.
+    lxml parser target that builds the same anchor records as EXTRACT_ANCHORS_JS
+    while the HTML streams through, without building a document tree. Each element
+    keeps at most ANCHOR_TEXT_LIMIT characters of text. A record completes when the
+    anchor's parent closes and is released in document order, so records wait until
+    every earlier anchor's parent has closed too: memory grows with the number of
+    pending anchors, and when an early anchor's parent is long-lived (e.g. <body>),
+    nothing is released until that parent closes. Like innerText, text inside
+    script, style, noscript and template elements is ignored, as are the anchors
+    within them.
+    """
+
+    def __init__(self):
+        self.stack = []
+        # Depth inside elements whose content is skipped (see _SKIPPED_TAGS).
+        self.skip_depth = 0
+        self.anchor_count = 0
+        self.next_position = 0
+        self.completed = {}
+
+    def start(self, tag, attrib):
+        if self.skip_depth or tag in _SKIPPED_TAGS:
+            self.skip_depth += 1
+            return
+        href = attrib.get("href") if tag == "a" else None
+        position = None
+        if href is not None:
+            position, self.anchor_count = self.anchor_count, self.anchor_count + 1
+        element = _Element(href, position, attrib.get("class", ""))
+        if href is not None and self.stack:
+            self.stack[-1].anchors.append(element)
+        self.stack.append(element)
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+            return
+        element = self.stack.pop()
+        text = element.text()
+        if self.stack:
+            if text:
+                parent = self.stack[-1]
+                parent.add_text(" ")
+                parent.add_text(text)
+                parent.add_text(" ")
+        elif element.href is not None:
+            # An anchor without a parent is its own context.
+            self.completed[element.position] = (element.href, text[:120], text, "")
+        for anchor in element.anchors:
+            self.completed[anchor.position] = (anchor.href, anchor.text()[:120], text, element.classes)
+
+    def data(self, text):
+        if self.stack and not self.skip_depth:
+            self.stack[-1].add_text(text)
+
+    def close(self):
+        return None
+
+    def drain(self):
+        """
+        Returns the completed records that follow, in document order, those already drained.
+        """
+        records = []
+        while self.next_position in self.completed:
+            records.append(self.completed.pop(self.next_position))
+            self.next_position += 1
+        return records
+
+
+def iter_anchors_from_html(content, chunk_size=64 * 1024):
+    """
+    Fallback for pages where in-page extraction fails: streams the HTML through
+    lxml in chunks and yields anchor records in document order, each once it and
+    all earlier records are complete (see AnchorCollector).
+    """
+    collector = AnchorCollector()
+    parser = etree.HTMLParser(target=collector, encoding="utf-8")
+    stream = io.BytesIO(content.encode("utf-8"))
+    while chunk := stream.read(chunk_size):
+        parser.feed(chunk)
+        yield from collector.drain()
+    parser.close()
+    yield from collector.drain()
+
+
+def scroll_and_capture(driver, url):
+    """
+    Loads the URL and scrolls until no new content is loaded, returning its anchor records.
+    """
+    driver.get(url)
+    # Wait until the document has finished loading rather than sleeping a fixed time.
+    try:
+        WebDriverWait(driver, 10).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+    except TimeoutException:
+        # Slow pages are still scrolled and captured with whatever has loaded.
+        pass
+    scroll_pause_time = 3
+    # Leave headroom over the in-page wait so the script resolves before Selenium gives up.
+    driver.set_script_timeout(scroll_pause_time + 2)
+    scroll_count = 0
+    while scroll_count < 10:
+        # One round-trip per scroll: the script scrolls, waits in-page for new content
+        # and reports whether the page grew.
+        grew = driver.execute_async_script(SCROLL_AND_WAIT_JS, scroll_pause_time * 1000)
+        if not grew:
+            break
+        scroll_count += 1
+    try:
+        return [tuple(record) for record in json.loads(driver.execute_script(EXTRACT_ANCHORS_JS, ANCHOR_TEXT_LIMIT))]
+    except JavascriptException as e:
+        print(f"In-page link extraction failed for {url}, parsing page source: {e}")
+        return list(iter_anchors_from_html(driver.page_source))
+
+
+def matching_rows(pattern, column, rows):
+    """
+    Returns the subset of `rows` (indices into `column`, a list of strings) that
+    `pattern` matches, using a single scan over those rows' newline-joined values.
+    """
+    joined = "\n".join(column[row].replace("\n", " ") for row in rows)
+    row_starts = []
+    offset = 0
+    for row in rows:
+        row_starts.append(offset)
+        offset += len(column[row]) + 1
+    return {rows[bisect_right(row_starts, match.start()) - 1] for match in pattern.finditer(joined)}
+
+
+def classify_links(hrefs, parent_texts, parent_classes):
+    """
+    Decides, for parallel columns of anchor data, which links likely point to
+    product pages. `parent_texts` hold the text of each anchor's parent, which
+    includes the anchor's own text. Each check only scans the rows that earlier,
+    cheaper checks left undecided.
     
-    Returns a tuple:
-        (direct_product: bool, ambiguous: bool, context_snippet: str)
-    """
-    href = a_tag.get("href")
-    if not href:
-        return (False, False, "")
-    direct_product = False
-    ambiguous = False
-    product_keywords = ['product', 'item']
-
-    # Check for direct URL patterns.
-    for keyword in product_keywords:
-        if re.search(rf"/{keyword}/", href):
-            direct_product = True
-
-    # Check parent element classes.
-    parent = a_tag.parent
-    if parent and parent.has_attr("class"):
-        parent_classes = " ".join(parent["class"])
-        if "product-card" in parent_classes or "product" in parent_classes or "item" in parent_classes:
-            direct_product = True
-
-    # Check anchor text for price or "Add to Cart".
-    anchor_text = a_tag.get_text().strip()
-    if re.search(r"\$\d+", anchor_text) or "add to cart" in anchor_text.lower():
-        direct_product = True
-
-    if parent:
-        parent_text = parent.get_text(separator=" ", strip=True)
-        if re.search(r"\$\d+", parent_text) or "add to cart" in parent_text.lower():
-            direct_product = True
-
-    # Mark ambiguous if no high-confidence signal but product keywords exist.
-    if not direct_product and any(kw in href for kw in product_keywords):
-        ambiguous = True
-
-    # Use parent's text as context (truncated to 200 characters)
-    context_snippet = parent.get_text(separator=" ", strip=True)[:200] if parent else ""
-    return (direct_product, ambiguous, context_snippet)
+    Returns a tuple of row-index lists:
+        (direct_product_rows, ambiguous_rows)
+    """
+    pending = list(range(len(hrefs)))
+    direct = set()
+
+    def take(pattern, column):
+        nonlocal pending
+        matched = matching_rows(pattern, column, pending)
+        pending = [row for row in pending if row not in matched]
+        return matched
+
+    # Clear-cut URL paths are resolved before looking at the surrounding markup.
+    direct |= take(_STRONG_PATH_RE, hrefs)
+    take(_NEGATIVE_RE, hrefs)
+    # URL path and the parent's text (price, "Add to Cart"); parent classes
+    # mentioning product/item (covers "product-card" too).
+    direct |= take(_HEURISTIC_RE, hrefs)
+    direct |= take(_HEURISTIC_RE, parent_texts)
+    direct |= take(_KW_RE, parent_classes)
+    # Ambiguous if no high-confidence signal but product keywords exist.
+    ambiguous = take(_KW_RE, hrefs)
+    return (sorted(direct), sorted(ambiguous))
+
+
+def is_candidate_href(href):
+    """
+    Cheap prefix/suffix test that rejects hrefs that cannot be product pages.
+    """
+    if href.startswith(_BAD_PREFIXES):
+        return False
+    return not href.rsplit("?", 1)[0].lower().endswith(_ASSET_EXTS)
+
+
+@lru_cache(maxsize=4096)
+def is_internal_netloc(netloc, base_netloc):
+    """
+    Checks if a netloc is the base domain or one of its subdomains (or empty, i.e. relative).
+    """
+    return netloc == "" or netloc.endswith(base_netloc)
 
 
 def is_internal_url(url, base_netloc):
@@ -111,25 +466,49 @@ def is_internal_url(url, base_netloc):
     Checks if the URL is internal based on the base domain netloc.
     """
     try:
-        parsed = urlparse(url)
-        if parsed.netloc == "" or parsed.netloc == base_netloc:
-            return True
-        # Also consider subdomains as internal.
-        if parsed.netloc.endswith(base_netloc):
-            return True
+        return is_internal_netloc(urlparse(url).netloc, base_netloc)
     except Exception:
-        pass
-    return False
+        return False
+
+
+def resolve_link(href, page_url, page_scheme, page_netloc, base_netloc):
+    """
+    Resolves an href found on page_url, returning (absolute_url, is_internal).
+    Absolute http(s) and root-relative hrefs take a string-only fast path; everything
+    else falls back to urljoin.
+    """
+    if href.startswith(("http://", "https://")):
+        netloc = href.split("/", 3)[2].partition("?")[0].partition("#")[0]
+        return href, is_internal_netloc(netloc, base_netloc)
+    if href.startswith("/") and not href.startswith("//") and "/." not in href:
+        # Same host as the page, which is internal since only internal pages are crawled.
+        return f"{page_scheme}://{page_netloc}{href}", True
+    absolute_url = urljoin(page_url, href)
+    return absolute_url, is_internal_url(absolute_url, base_netloc)
+
+
+def open_groq_client():
+    """
+    Creates an aiohttp-backed AsyncGroq client. Use it as an async context manager
+    around a whole crawl run: its session is bound to the running event loop, and
+    every Streamlit rerun runs the crawl in a new loop (asyncio.run).
+    """
+    return AsyncGroq(http_client=DefaultAioHttpClient())
 
 
-def validate_links_with_llm(batch):
+async def validate_links_with_llm(batch, groq_client):
     """
     Given a batch of ambiguous links (each a tuple of (url, context)), 
-    send them to the LLM API (via groq) for product page validation.
-    Returns a list of verdicts ("YES" or "NO") corresponding to the batch.
+    send them to the LLM API (via the shared groq_client) for product page validation.
+    Returns a list of verdicts ("YES", "NO", or None where the model's answer is
+    not one of those) in batch order. It is empty if the call fails or the reply
+    does not hold exactly one verdict per link, since a missing or extra entry
+    makes it impossible to tell which link each verdict belongs to.
     """
     prompt_lines = [
-        "Determine if these links point to product pages. Reply 'YES' or 'NO' for each:"
+        "Determine if these links point to product pages. "
+        'Return ONLY a JSON object {"verdicts": [...]} holding one "YES" or "NO" string '
+        "per link, in order, no prose. Links:"
     ]
     for idx, (link, context) in enumerate(batch, start=1):
         prompt_lines.append(f"{idx}. Link: {link} | Context: {context}")
@@ -137,38 +516,36 @@ def validate_links_with_llm(batch):
     try:
         print(f"INFO: Making LLM API call with batch size {len(batch)}")
         messages = [{"role": "user", "content": prompt_message}]
-        completion = groq_client.chat.completions.create(
-            model="deepseek-r1-distill-llama-70b",
+        completion = await groq_client.chat.completions.create(
+            model="llama-3.1-8b-instant",
             messages=messages,
-            temperature=0.6,
-            max_completion_tokens=1024,
-            top_p=0.95,
-            stream=True,
-            reasoning_format="raw"
+            temperature=0,
+            # About 6 tokens per '"YES", ' entry plus the object wrapper.
+            max_completion_tokens=6 * len(batch) + 8,
+            response_format={"type": "json_object"},
         )
-        response = ""
-        for chunk in completion:
-            response += chunk.choices[0].delta.content or ""
+        response = completion.choices[0].message.content or ""
+        verdicts = json.loads(_JSON_ARRAY_RE.search(response).group(0))
     except Exception as e:
-        print("LLM API call failed:", e)
-        response = ""
+        print("LLM API call or verdict parsing failed:", e)
+        return []
+    if len(verdicts) != len(batch):
+        print(f"LLM returned {len(verdicts)} verdicts for a batch of {len(batch)}; discarding them")
+        return []
     
-    verdicts = []
-    for line in response.splitlines():
-        line_clean = line.strip().upper()
-        if "YES" in line_clean:
-            verdicts.append("YES")
-        elif "NO" in line_clean:
-            verdicts.append("NO")
-    if len(verdicts) < len(batch):
-        verdicts.extend(["NO"] * (len(batch) - len(verdicts)))
-    return verdicts
+    return [
+        verdict.strip().upper() if isinstance(verdict, str) and verdict.strip().upper() in _VERDICTS else None
+        for verdict in verdicts
+    ]
 
 
-def crawl_category_page(url):
+async def crawl_category_page(url, groq_client, llm_slots):
     """
     Crawls a given category page URL to find product URLs.
     Applies both direct heuristics and LLM-batched validation for ambiguous links.
+    Selenium fetches run in a worker thread; LLM batches are validated concurrently
+    through groq_client (see open_groq_client), bounded by the run-wide llm_slots
+    semaphore.
     """
     print(f"Crawling category page: {url}")
     
@@ -176,55 +553,90 @@ def crawl_category_page(url):
     parsed_base = urlparse(category_url)
     base_netloc = parsed_base.netloc
     
-    visited = set()
-    to_visit = [(category_url, 0)]
+    # URLs are marked visited when enqueued so the queue never holds duplicates. A
+    # scalable Bloom filter keeps this small on deep crawls; a rare false positive
+    # only skips crawling a page, while product_urls stays an exact set.
+    visited = ScalableBloomFilter(initial_capacity=10_000, error_rate=1e-4)
+    visited.add(category_url)
+    to_visit = deque([(category_url, 0)])
     max_depth = 0
     product_urls = set()
     ambiguous_links = []
     
     while to_visit:
-        current_url, depth = to_visit.pop(0)
-        if current_url in visited or depth > max_depth:
-            continue
-        visited.add(current_url)
+        current_url, depth = to_visit.popleft()
         print(f"Fetching: {current_url} (depth {depth})")
-        content = fetch_category_page_content(current_url)
-        if not content:
+        anchors = await asyncio.to_thread(fetch_category_page_content, current_url)
+        if not anchors:
             continue
         
-        soup = BeautifulSoup(content, "html.parser")
-        a_tags = soup.find_all("a", href=True)
-        for a in a_tags:
-            href = a["href"]
-            absolute_url = urljoin(current_url, href)
-            if not is_internal_url(absolute_url, base_netloc):
-                continue
-            
-            direct, ambiguous, context = determine_link_type(a)
-            if direct:
-                product_urls.add(absolute_url)
-            elif ambiguous:
-                ambiguous_links.append((absolute_url, context))
-            
-            if absolute_url not in visited and depth < max_depth:
-                to_visit.append((absolute_url, depth + 1))
+        # Split the records into columns once, then filter and classify column-wise.
+        rows = [record for record in anchors if record[0] and is_candidate_href(record[0])]
+        page_scheme, page_netloc = urlparse(current_url)[:2]
+        resolved = [
+            resolve_link(record[0], current_url, page_scheme, page_netloc, base_netloc)
+            for record in rows
+        ]
+        internal_rows = [row for row, (_, internal) in enumerate(resolved) if internal]
+        links = [resolved[row][0] for row in internal_rows]
+        hrefs = [rows[row][0] for row in internal_rows]
+        parent_texts = [rows[row][2] for row in internal_rows]
+        parent_classes = [rows[row][3] for row in internal_rows]
+
+        direct_rows, ambiguous_rows = classify_links(hrefs, parent_texts, parent_classes)
+        product_urls.update(normalize_url(links[row]) for row in direct_rows)
+        # Use parent's text as context (already truncated to ANCHOR_TEXT_LIMIT by the extractors)
+        ambiguous_links.extend((links[row], parent_texts[row]) for row in ambiguous_rows)
+
+        if depth < max_depth:
+            for absolute_url in links:
+                if absolute_url not in visited:
+                    visited.add(absolute_url)
+                    to_visit.append((absolute_url, depth + 1))
         
-    # Process ambiguous links in batches.
+    # Deduplicate ambiguous links on their normalized URL, keeping the first context seen.
+    seen = set()
+    unique_links = []
+    for link, context in ambiguous_links:
+        link = normalize_url(link)
+        if link not in seen:
+            seen.add(link)
+            unique_links.append((link, context))
+
+    # Reuse verdicts for links already validated; only send the rest to the LLM.
+    verdict_cache = get_verdict_cache()
+    uncached_links = []
+    for link, context in unique_links:
+        verdict = verdict_cache.get(verdict_cache_key(link, context))
+        if verdict is None:
+            uncached_links.append((link, context))
+        elif verdict == "YES":
+            product_urls.add(link)
+
+    # Process ambiguous links in batches, validating all batches concurrently.
     batch_size = 10
-    for i in range(0, len(ambiguous_links), batch_size):
-        batch = ambiguous_links[i : i + batch_size]
-        verdicts = validate_links_with_llm(batch)
-        for (link, _), verdict in zip(batch, verdicts):
-            if verdict.upper() == "YES":
+    batches = [
+        uncached_links[i : i + batch_size]
+        for i in range(0, len(uncached_links), batch_size)
+    ]
+
+    async def validate(batch):
+        async with llm_slots:
+            return await validate_links_with_llm(batch, groq_client)
+
+    verdicts_list = await asyncio.gather(*(validate(b) for b in batches))
+    for batch, verdicts in zip(batches, verdicts_list):
+        for (link, context), verdict in zip(batch, verdicts):
+            if verdict is None:
+                # Unanswered links are not products for this crawl and are asked again next time.
+                continue
+            verdict_cache[verdict_cache_key(link, context)] = verdict
+            if verdict == "YES":
                 product_urls.add(link)
     
     return list(product_urls)
 
 
-async def async_crawl_category_page(url):
-    return await asyncio.to_thread(crawl_category_page, url)
-
-
 # ---------------------------------------------------------------------------------
 # Streamlit App Interface
 # ---------------------------------------------------------------------------------
@@ -245,11 +657,27 @@ def streamlit_app():
         else:
             category_urls = [line.strip() for line in input_text.splitlines() if line.strip()]
             
-            # Define an async function to concurrently crawl pages.
+            progress = st.progress(0.0, text=f"Crawled 0 of {len(category_urls)} category pages")
+            
+            # Define an async function to concurrently crawl pages, bounded by the driver pool.
             async def crawl_all(urls):
-                tasks = [async_crawl_category_page(url) for url in urls]
-                responses = await asyncio.gather(*tasks)
-                return dict(zip(urls, responses))
+                crawl_slots = asyncio.Semaphore(CRAWL_CONCURRENCY)
+                
+                # One Groq client (and aiohttp session) and one LLM concurrency limit
+                # shared by every crawl in this run.
+                llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+                async with open_groq_client() as groq_client:
+                    async def crawl_one(url):
+                        async with crawl_slots:
+                            return url, await crawl_category_page(url, groq_client, llm_slots)
+                    
+                    responses = {}
+                    for done, task in enumerate(asyncio.as_completed([crawl_one(url) for url in urls]), start=1):
+                        url, product_urls = await task
+                        responses[url] = product_urls
+                        progress.progress(done / len(urls), text=f"Crawled {done} of {len(urls)} category pages")
+                # Report results in input order rather than completion order.
+                return {url: responses[url] for url in urls}
             
             with st.spinner("Crawling category pages concurrently ..."):
                 results = asyncio.run(crawl_all(category_urls))
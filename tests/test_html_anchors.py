@@ -0,0 +1,31 @@
+from main import ANCHOR_TEXT_LIMIT, iter_anchors_from_html
+
+
+def test_records_match_in_page_extraction():
+    html = '<div class="product-card"><a href="/p/1">Nice   Jacket</a> <span>$29</span></div>'
+    assert list(iter_anchors_from_html(html)) == [("/p/1", "Nice Jacket", "Nice Jacket $29", "product-card")]
+
+
+def test_script_and_style_text_is_ignored():
+    html = (
+        '<div class=c><script>if (a<b) {}</script><style>a{}</style>'
+        '<a href="/s">S</a><noscript><a href="/n">add to cart</a></noscript></div>'
+    )
+    assert list(iter_anchors_from_html(html)) == [("/s", "S", "S", "c")]
+
+
+def test_records_are_in_document_order():
+    html = '<div><a href="/1">one</a><span><a href="/2">two</a></span></div><a href="/3">three</a>'
+    assert [record[0] for record in iter_anchors_from_html(html)] == ["/1", "/2", "/3"]
+
+
+def test_chunked_feed_matches_single_feed():
+    html = "<ul>" + "".join(f'<li class="item"><a href="/i/{n}">Item {n}</a> ${n}</li>' for n in range(50)) + "</ul>"
+    assert list(iter_anchors_from_html(html, chunk_size=7)) == list(iter_anchors_from_html(html))
+
+
+def test_parent_text_is_capped():
+    html = '<div>' + "x" * 1000 + '<a href="/z">Z</a></div>'
+    [(_, anchor_text, parent_text, _)] = iter_anchors_from_html(html)
+    assert anchor_text == "Z"
+    assert len(parent_text) == ANCHOR_TEXT_LIMIT